@@ -118,10 +118,34 @@ _PROGRAM_NAME = 'pathtemplater'
 #
 # -------------------------------------------------------------------------------
 
-_PROGRAM_VERSION = '1.0.0.dev7'
+_PROGRAM_VERSION = '1.0.0.dev8'
 # -------------------------------------------------------------------------------
 # ### Change log
 #
+# version 1.0.0.dev8 2026-10-15
+# : Performance improvements: template parse results are cached and reused
+#   when formatting paths (see `clear_cache()`), and derived objects are
+#   created with a shallow copy instead of `copy.deepcopy()`
+# : Assembled paths are cached, suffixes are always added to the end of the
+#   filename template
+# : Bugfix in clear_dict(), which replaced the directory instead of clearing
+#   the format dictionary
+# : Added iter_expand(), a lazy version of expand()
+# : expand_ends() now takes the end labels (and optionally the placeholder
+#   name) as parameters, previously relied on undefined names
+# : format_dict property returns a copy, changes to it no longer affect the
+#   object or objects derived from it
+# : Top directory, alt suffix and preset names whose functions would clash
+#   with an existing attribute (e.g. a preset named `use`) raise `ValueError`,
+#   these functions can no longer shadow existing ones
+# : PathTemplater uses `__slots__`, arbitrary attributes can no longer be set
+#   on objects
+# : Suffixes without a leading dot are no longer rejected, e.g.
+#   `new_suffix("gz")` gives `a/bgz` for `a/b.txt` instead of raising
+#   `ValueError: Invalid suffix`
+# : format() raises a `KeyError` listing all missing placeholders when more
+#   than one is missing
+#
 # version 1.0.0.dev7 2019-02-07
 # : Bugfix in no_suffix()
 #
@@ -162,12 +186,12 @@ _PROGRAM_VERSION = '1.0.0.dev7'
 # -------------------------------------------------------------------------------
 
 import pathlib
+import sys
 import warnings
-import copy
-import types
 import string
 import itertools
-import typing
+import functools
+import collections.abc
 
 class _AsIsFormat:
     """
@@ -180,21 +204,37 @@ class _AsIsFormat:
     """
     def __init__(self, key):
         self.key = key
+        self._prefix = "{" + key
+        self._as_is = self._prefix + "}" # output without format_spec, most common
+        self._formatted = {} # output by format_spec/index, objects are shared
     def __getitem__(self, index):
-    	return "{" + self.key + "[" + index + "]}"
+        formatted = self._formatted.get(('[', index))
+        if formatted is None:
+            formatted = self._formatted[('[', index)] = self._prefix + "[" + str(index) + "]}"
+        return formatted
     def __format__(self, format_spec):
-    	return "{" + self.key + ((":" + format_spec) if format_spec else "") + "}"
+        if not format_spec: return self._as_is
+        formatted = self._formatted.get(format_spec)
+        if formatted is None:
+            formatted = self._formatted[format_spec] = self._prefix + ":" + format_spec + "}"
+        return formatted
+
+_ASIS_FORMATS = {}
+    # shared `_AsIsFormat` objects by key, see `_PartialDict.__missing__()`
 
 class _PartialDict(dict):
     """
     Simple derived dict that returns an as-is formatter for missing keys.
 
     To partially format a string use, e.g.:
-    `string.Formatter().vformat('{name} {job} {bye}',(),_PartialDict(name="me", job="you"))`
+    `'{name} {job} {bye}'.format_map(_PartialDict(name="me", job="you"))`
     which gives `me you {bye}`
     """
     def __missing__(self, key):
-        return _AsIsFormat(key)
+        as_is_format = _ASIS_FORMATS.get(key)
+        if as_is_format is None:
+            as_is_format = _ASIS_FORMATS[key] = _AsIsFormat(key)
+        return as_is_format
 
 class _TrackingPartialDict(_PartialDict):
     """
@@ -205,7 +245,96 @@ class _TrackingPartialDict(_PartialDict):
         super(_TrackingPartialDict, self).__init__(*args, **kwargs)
     def __getitem__(self, index):
         self.used_items.add(index)
-        return super(_TrackingPartialDict, self).__getitem__(index)
+        return dict.__getitem__(self, index)
+            # calls __missing__() for missing keys, avoids super() dispatch
+
+def _get_suffixes(name):
+    """
+    Return all suffixes of filename `name` combined, e.g. `.tar.gz` for
+    `myfile.tar.gz`. Same as `"".join(pathlib.PurePath(name).suffixes)`.
+    """
+    if name.endswith('.'): return ""
+    dot = name.find('.', len(name) - len(name.lstrip('.'))) # leading dots are not suffixes
+    return name[dot:] if dot != -1 else ""
+
+@functools.lru_cache(maxsize=4096)
+def _assemble_template(topdir_value, directory, filename_template,
+                       filename_affix, suffix):
+    """
+    Assemble the unformatted path string from its elements. Results are
+    cached, as many objects share the same elements (in particular top
+    directory and directory), so `pathlib` is only used once per path.
+    """
+    return str(pathlib.PurePath(topdir_value, directory, filename_template + filename_affix)) + suffix
+        # suffix added to any existing suffix on template
+
+_FORMATTER = string.Formatter()
+
+_COLLECTION_TYPES = (list, tuple, set, frozenset, dict)
+    # common collection types, checked before the slower `collections.abc`
+    # `isinstance()` check for an iterable
+
+def _is_iterable(value):
+    """
+    Return `True` if `value` is a collection of placeholder values, i.e.
+    an iterable other than a string.
+    """
+    if isinstance(value, _COLLECTION_TYPES): return True
+    if isinstance(value, str): return False
+    return isinstance(value, collections.abc.Iterable)
+
+def _as_values(value):
+    """
+    Return `value` as an iterable of placeholder values, for expanding with
+    a combinator: iterables (see `_is_iterable()`) as-is, and strings or
+    other values as a single value.
+    """
+    return value if _is_iterable(value) else (value,)
+
+_SETTOPDIR_METHODNAMES = {}
+_SETFILESUFFIX_METHODNAMES = {}
+    # interned method names by top directory/alternate suffix name, see
+    # `PathTemplater._get_settopdir_methodname()` and
+    # `PathTemplater._get_setfilesuffix_methodname()`
+
+@functools.lru_cache(maxsize=1024)
+def _parse_template(template):
+    """
+    Parse `template` into a tuple of
+    `(literal_text, field_name, format_spec, conversion)` tokens as per
+    `string.Formatter.parse()`. Results are cached, as the same template
+    strings are used repeatedly.
+    """
+    return tuple(_FORMATTER.parse(template))
+
+@functools.lru_cache(maxsize=1024)
+def _template_fields(template):
+    """
+    Return a tuple of the unique named placeholders in `template`, in order
+    of first appearance, including any nested in format specs. Only the
+    name is returned for placeholders with attribute or index access, e.g.
+    `key` for `{key.attr}` or `{key[index]}`. Results are cached.
+    """
+    field_names = []
+    for _, field_name, format_spec, _ in _parse_template(template):
+        if field_name:
+            field_name = field_name.partition('.')[0].partition('[')[0]
+            if field_name and not field_name.isdigit() and field_name not in field_names:
+                field_names.append(field_name)
+        if format_spec and '{' in format_spec:
+            for field_name in _template_fields(format_spec):
+                if field_name not in field_names:
+                    field_names.append(field_name)
+    return tuple(field_names)
+
+@functools.lru_cache(maxsize=1024)
+def _format_as_is(template):
+    """
+    Partially format `template` with no placeholder values, i.e. keeping
+    all placeholders intact (escaped braces are still unescaped). Results
+    are cached.
+    """
+    return template.format_map(_PartialDict())
 
 class PathTemplater:
     """
@@ -235,8 +364,7 @@ class PathTemplater:
           will be expanded
 
     To use the path as a string, the `use()` member function is called. This
-    will generate the path (using a `PathLib.path` object), turn it into a
-    string and use values present in the `format_dict` to resolve any
+    will generate the path as a string and use values present in the `format_dict` to resolve any
     corresponding wildcards (by name). Partial wildcard expansion is allowed.
     This provides flexibility for use in Snakemake rules - any wildcards that
     Snakemake should resolve itself are simply left unspecified when using the
@@ -278,13 +406,29 @@ class PathTemplater:
         resolved, resolved or expanded wildcards.
 
     """
+    _INIT_TOPDIR = 0b001
+    _INIT_DIRECTORY = 0b010
+    _INIT_TEMPLATE = 0b100
+    _INIT_ALL = _INIT_TOPDIR | _INIT_DIRECTORY | _INIT_TEMPLATE
+        # bits of `_init_flags`, set when top directory, directory and
+        # filename template have been set, see `_is_initialized()`
+    __slots__ = ('_init_flags', '_topdirs', '_altsuffixes', '_presets',
+                 '_topdir_name', '_topdir_value',
+                 '_directory', '_filename_template', '_suffix', '_filename_affix',
+                 '_format_dict', '_template_str', '_has_placeholders',
+                 '_use_cache', '_dyn_cache', '__weakref__')
+    _CLONE_ATTRS = tuple(attr for attr in __slots__
+                         if attr not in ('_use_cache', '_dyn_cache', '__weakref__'))
+        # attributes copied as-is by `_clone()`
     def __init__(self, top_directories = None, alt_suffixes = None,
                  preset_formats = None):
-        self._extra_attrs = {'topdirs':[], 'alt_suffixes':[], 'presets':[]}
-            # for tracking extra functions added to this object
-            # using list so that items stay ordered to prevent doctest errors
-            # set would be more efficient but adding functions done sparingly
-            # and so performance hit is neglible
+        self._init_flags = 0
+        self._topdirs = {} # topdir_name : topdir_value
+        self._altsuffixes = {} # altsuffix_name : (altsuffix_value, altsuffix_append, topdirectory)
+        self._presets = {} # preset_name : (preset function, format_dict)
+            # methods for these are provided by __getattr__()
+            # dicts stay ordered, preventing doctest errors in __repr__()
+        self._dyn_cache = None # methods generated by __getattr__() by name
         self._reset_topdir()
         self._reset_dfs()
         if not top_directories:
@@ -295,36 +439,52 @@ class PathTemplater:
             # initalize to this top directory directly, as no changing
             # top directory is possible
             self._topdir_name, self._topdir_value = next(iter(top_directories.items() ))
+            self._init_flags |= PathTemplater._INIT_TOPDIR
         else:
-            # add bound methods to instance to set top directory
+            # provide methods to set top directory
             # e.g. self.outputdir() to set to current topdir to 'output' topdir
             # top directory
             # one of these functions must be called after creating the object
             # to initalize the object
-            for name, value in top_directories.items():
-                PathTemplater._add_topdir_func(self, PathTemplater._get_settopdir_methodname(name),
-                    PathTemplater._set_topdir_boundmethod(self, name, value))
+            for name in top_directories:
+                PathTemplater._check_methodname(PathTemplater._get_settopdir_methodname(name))
+            self._topdirs = dict(top_directories)
         self.add_alt_suffixes(alt_suffixes)
         self.add_preset_formats(preset_formats)
-    @staticmethod
-    def _add_func(functype, obj, funcname, func):
-        """
-        Adds `func` to `obj` as `funcname` using `setattr()`, but adds
-        `funcname` to set given by `obj._extrattrs[functype]` for tracking
-        purposes.
-        """
-        if funcname not in obj._extra_attrs[functype]:
-            obj._extra_attrs[functype].append(funcname)
-        setattr(obj, funcname, func)
-    @staticmethod
-    def _add_topdir_func(obj, funcname, func):
-        PathTemplater._add_func('topdirs', obj, funcname, func)
-    @staticmethod
-    def _add_altsuffix_func(obj, funcname, func):
-        PathTemplater._add_func('alt_suffixes', obj, funcname, func)
-    @staticmethod
-    def _add_preset_func(obj, funcname, func):
-        PathTemplater._add_func('presets', obj, funcname, func)
+    _DISPATCH_ATTRS = frozenset(('_topdirs', '_altsuffixes', '_presets', '_dyn_cache'))
+    def __getattr__(self, name):
+        """
+        Return the preset (`{preset_name}()`), alternate suffix
+        (`{altsuffix_name}file()`) or top directory (`{topdir_name}dir()`)
+        method `name` for this object, generated from `_presets`,
+        `_altsuffixes` and `_topdirs`. Only called when normal attribute
+        lookup fails. Generated methods are stored in `_dyn_cache` for reuse.
+        """
+        if name in PathTemplater._DISPATCH_ATTRS: # not yet set, prevent recursion
+            raise AttributeError(name)
+        dyn_cache = self._dyn_cache
+        if dyn_cache is not None:
+            method = dyn_cache.get(name)
+            if method is not None: return method
+        method = None
+        preset = self._presets.get(name)
+        if preset is not None:
+            preset_func, format_dict = preset
+            method = functools.partial(preset_func, self, **format_dict)
+        elif name.endswith('file') and name[:-4] in self._altsuffixes:
+            altsuffix_name = name[:-4]
+            method = functools.partial(PathTemplater._set_altsuffix, self, altsuffix_name,
+                                       *self._altsuffixes[altsuffix_name])
+        elif name.endswith('dir') and name[:-3] in self._topdirs:
+            topdir_name = name[:-3]
+            method = functools.partial(PathTemplater._set_topdir, self,
+                                       topdir_name, self._topdirs[topdir_name])
+        if method is None:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        if dyn_cache is None:
+            dyn_cache = self._dyn_cache = {}
+        dyn_cache[name] = method
+        return method
     def add_alt_suffixes(self, alt_suffixes):
         """
         Add `alt_suffixes` to this object, each is in the format of
@@ -340,6 +500,10 @@ class PathTemplater:
 
         """
         if alt_suffixes:
+            # may be shared with copies of this object (see `_clone()`),
+            # so replace rather than alter
+            altsuffixes = self._altsuffixes = dict(self._altsuffixes)
+            self._dyn_cache = None # may hold replaced methods
             for name, value in alt_suffixes.items():
                 if '/' in value:
                     directory, suffix = value.split('/',1)
@@ -352,8 +516,8 @@ class PathTemplater:
                 else:
                     altsuffix_append = False
                     altsuffix = suffix
-                PathTemplater._add_altsuffix_func(self, PathTemplater._get_setfilesuffix_methodname(name),
-                    PathTemplater._set_altsuffix_boundmethod(self, name, altsuffix, altsuffix_append, directory))
+                PathTemplater._check_methodname(PathTemplater._get_setfilesuffix_methodname(name))
+                altsuffixes[name] = (altsuffix, altsuffix_append, directory)
     def add_preset_formats(self,preset_formats):
         """
         Add `preset_formats` to this object, in the format
@@ -448,6 +612,12 @@ class PathTemplater:
         ...
         ValueError: Cannot use callable with expand()-style format
 
+        Preset names cannot be the same as an existing attribute of the object:
+        >>> foobar_templater.add_preset_formats({'use' : {'animal' : 'cat'}})
+        Traceback (most recent call last):
+        ...
+        ValueError: Cannot add function use, name already used by PathTemplater
+
         An of course, the function specified in the format must exist in the
         object (and be callable with the provided parameters, if any):
         >>> foobar_templater.add_preset_formats({'will_fail' : {'zipfile':([],{})}})
@@ -470,33 +640,39 @@ class PathTemplater:
          formatted: (uninitialized)
         """
         if preset_formats: # TODO add type checking
+            presets = self._presets = dict(self._presets) # as in add_alt_suffixes()
+            self._dyn_cache = None
             for preset_name, format_dict in preset_formats.items():
+                PathTemplater._check_methodname(preset_name)
                 # check if any of the provided values in format_dict is a collection
                 have_iterable = False
                 have_callable = False
+                is_funcparams_tuple = PathTemplater._is_funcparams_tuple
                 for format_value in format_dict.values():
-                    if isinstance(format_value, typing.Iterable) and not isinstance(format_value, str):
-                        # ([],{}) -> specifies funciton to call
-                        if PathTemplater._is_funcparams_tuple(format_value):
-                            have_callable = True
-                        else:
-                            have_iterable = True
-                if have_iterable:
-                    if have_callable:
+                    if is_funcparams_tuple(format_value):
+                        # ([],{}) -> specifies function to call
+                        have_callable = True
+                    elif _is_iterable(format_value):
+                        have_iterable = True
+                    else:
+                        continue
+                    if have_iterable and have_callable:
                         raise ValueError("Cannot use callable with expand()-style format")
-                    the_func = PathTemplater._preset_expand_boundmethod
+                if have_iterable:
+                    the_func = PathTemplater._expand_preset
                 else:
                     if have_callable:
-                        the_func = PathTemplater._preset_addtodict_withcalls_boundmethod
+                        the_func = PathTemplater._add_to_dict_with_calls
                     else:
-                        the_func = PathTemplater._preset_addtodict_boundmethod
-                PathTemplater._add_preset_func(self, preset_name, the_func(self, **format_dict))
+                        the_func = PathTemplater.add_to_dict
+                presets[preset_name] = (the_func, dict(format_dict))
     def _reset_topdir(self):
         """
         Reset top directory settings.
         """
         self._topdir_name = None # internal name of topdir
         self._topdir_value = None # actual value of topdir, used for formatting paths
+        self._init_flags &= ~PathTemplater._INIT_TOPDIR
 
     def _reset_dfs(self):
         """
@@ -504,16 +680,34 @@ class PathTemplater:
         """
         self._directory = None
         self._filename_template = None
+        self._init_flags &= ~(PathTemplater._INIT_DIRECTORY | PathTemplater._INIT_TEMPLATE)
         self._suffix = ""
         self._filename_affix = ""
         self._format_dict = {}
+        self._template_str = None # unformatted path, see _build_template_str()
+        self._has_placeholders = False
+        self._use_cache = None # see use()
+    def _clone(self):
+        """
+        Return a copy of this object. Used instead of `copy.deepcopy()` as
+        all attributes are immutable, except `_format_dict`, `_topdirs`,
+        `_altsuffixes` and `_presets`, which are shared with the copy. These are never
+        altered in place, methods that change them assign a new `dict`
+        instead (copy-on-write).
+        """
+        new_obj = object.__new__(type(self))
+        for attr in PathTemplater._CLONE_ATTRS:
+            setattr(new_obj, attr, getattr(self, attr))
+        new_obj._use_cache = None
+        new_obj._dyn_cache = None # methods are bound to self, not shared
+        return new_obj
     def _is_initialized(self):
         """
         Return `True` if this object has been fully initialized with a
         top directory, directory and filename template.
         """
-        return self._topdir_name is not None and self._directory is not None and self._filename_template is not None
-    def create(self, path, filename_affix = "", format_dict = {}):
+        return self._init_flags == PathTemplater._INIT_ALL
+    def create(self, path, filename_affix = "", format_dict = None):
         """
         Initialize an empty `PathTemplater` object, generating directory,
         filename template and suffix by splitting `path`, and optional
@@ -524,14 +718,15 @@ class PathTemplater:
         """
         if self._is_initialized():
             raise ValueError("Cannot use create() with initialized PathTemplater")
-        the_path = pathlib.Path(path)
+        the_path = pathlib.PurePath(path) # handles drives, roots and separators
         directory = str(the_path.parent)
-        suffix = "".join(the_path.suffixes) # want all suffixes combined
-        filename_template = the_path.name.replace(suffix,"") # stem removes only 1 suffix
+        name = the_path.name
+        suffix = _get_suffixes(name) # want all suffixes combined
+        filename_template = name[:-len(suffix)] if suffix else name # stem removes only 1 suffix
         return self.create_fromparts(directory, filename_template, suffix, filename_affix,
                            format_dict)
     def create_fromparts(self, directory, filename_template, suffix = "",
-        filename_affix = "", format_dict = {}):
+        filename_affix = "", format_dict = None):
         """
         Initialize a new `PathTemplater` object from `directory`,
         `filename_template` and optional `suffix`,
@@ -542,12 +737,16 @@ class PathTemplater:
         """
         if self._is_initialized():
             raise ValueError("Cannot use create_fromparts() with initialized PathTemplater")
-        new_obj = copy.deepcopy(self)
-        new_obj._directory = directory
+        new_obj = self._clone()
+        new_obj._directory = str(directory)
         new_obj._filename_template = filename_template
         new_obj._suffix = suffix
         new_obj._filename_affix = filename_affix
-        new_obj._format_dict.update(format_dict)
+        new_obj._init_flags |= PathTemplater._INIT_DIRECTORY | PathTemplater._INIT_TEMPLATE
+        if format_dict:
+            new_obj._format_dict = dict(self._format_dict)
+            new_obj._format_dict.update(format_dict)
+        new_obj._update_template_str()
         return new_obj
     @property
     def topdirectory(self):
@@ -629,14 +828,15 @@ class PathTemplater:
     @property
     def format_dict(self):
         """
-        Get the format dictionary
+        Get a copy of the format dictionary. Use `add_to_dict()` to derive
+        an object with different values.
 
         >>> foobar_templater = PathTemplater().create("bar/myfile_{animal}.foobar")
         >>> foobar_templater.add_to_dict(animal = "cat").format_dict
         {'animal': 'cat'}
 
         """
-        return self._format_dict
+        return dict(self._format_dict) # internal dict is shared with derived objects
     @staticmethod
     def _is_funcparams_tuple(x):
         """
@@ -644,42 +844,50 @@ class PathTemplater:
         """
         return isinstance(x,tuple) and len(x)==2 and isinstance(x[0],list) and isinstance(x[1],dict)
     @staticmethod
+    def _check_methodname(methodname):
+        """
+        Raise `ValueError` if `methodname`, the name of a top directory,
+        alternate suffix or preset function, is already used by the class.
+        These functions are provided by `__getattr__()`, so could not be
+        reached.
+        """
+        if hasattr(PathTemplater, methodname):
+            raise ValueError("Cannot add function {}, name already used by PathTemplater".format(methodname))
+    @staticmethod
     def _get_settopdir_methodname(topdir_name):
         """
         Return the name of the method name to set top directory to `topdir_name`
         e.g. `outputdir()` for setting to `output`.
         """
-        return topdir_name+'dir'
+        methodname = _SETTOPDIR_METHODNAMES.get(topdir_name)
+        if methodname is None:
+            methodname = sys.intern(topdir_name+'dir')
+            _SETTOPDIR_METHODNAMES[topdir_name] = methodname
+        return methodname
+    @staticmethod
     def _get_setfilesuffix_methodname(altsuffix_name):
         """
         Return the name of the method name to set suffix to `altsuffix_name`
         e.g. `logfile()` for setting to `log`.
         """
-        return altsuffix_name+'file'
-    @staticmethod
-    def _bound_method(function, instance):
-        """
-        Return a `function` as bound method of `instance`.
-        """
-        return types.MethodType(function, instance)
-            # Python 3: types.MethodType(function, instance)
+        methodname = _SETFILESUFFIX_METHODNAMES.get(altsuffix_name)
+        if methodname is None:
+            methodname = sys.intern(altsuffix_name+'file')
+            _SETFILESUFFIX_METHODNAMES[altsuffix_name] = methodname
+        return methodname
     @staticmethod
     def _set_topdir(cur_obj, topdir_name, topdir_value):
         """
         Generate a copy of `cur_obj` with `_topdir_name, _topdir_value` member
         variables set to `topdir_name, topdir_value`.
         """
-        new_obj = copy.deepcopy(cur_obj)
+        new_obj = cur_obj._clone()
         new_obj._topdir_name = topdir_name
         new_obj._topdir_value = topdir_value
+        new_obj._init_flags |= PathTemplater._INIT_TOPDIR
+        new_obj._update_template_str()
         return new_obj
     @staticmethod
-    def _set_topdir_boundmethod(instance, topdir_name, topdir_value):
-        """
-        Generate bound method of `instance._set_topdir(topdir_name, topdir_value)`.
-        """
-        return PathTemplater._bound_method(lambda self: PathTemplater._set_topdir(self, topdir_name, topdir_value), instance)
-    @staticmethod
     def _set_altsuffix(cur_obj, altsuffix_name, altsuffix_value, altsuffix_append, topdirectory):
         """
         Generate a copy of `cur_obj` with `suffix` changed/appended with
@@ -695,18 +903,16 @@ class PathTemplater:
                 raise ValueError('Attempting to set top directory to invalid value {} in alt suffix call'.format(topdirectory))
             new_obj = set_topdir_method() # change directory to that top directory
         if new_obj is None: # otherwise just create object copy
-            new_obj = copy.deepcopy(cur_obj)
+            new_obj = cur_obj._clone()
         if altsuffix_append:
-            new_obj._suffix += altsuffix_value
+            suffix = new_obj._suffix + altsuffix_value
         else:
-            new_obj._suffix = altsuffix_value
+            suffix = altsuffix_value
+        if suffix != new_obj._suffix:
+            # path unchanged (e.g. repeated call) unless suffix differs
+            new_obj._suffix = suffix
+            new_obj._update_template_str()
         return new_obj
-    @staticmethod
-    def _set_altsuffix_boundmethod(instance, altsuffix_name, altsuffix_value, altsuffix_append, topdirectory):
-        """
-        Generate bound method of `instance._set_suffix(altsuffix_name, altsuffix_value, altsuffix_append, topdirectory)`.
-        """
-        return PathTemplater._bound_method(lambda self: PathTemplater._set_altsuffix(self, altsuffix_name, altsuffix_value, altsuffix_append, topdirectory), instance)
     def _add_to_dict_with_calls(self,**kwargs):
         """
         Generate a copy of the object that contains `**kwargs` added to the
@@ -716,7 +922,7 @@ class PathTemplater:
         values as `*args` and `**kwargs`
 
         """
-        new_obj = copy.deepcopy(self)
+        new_obj = self._clone()
         used_items = set()
         for param,param_value in kwargs.items():
             if PathTemplater._is_funcparams_tuple(param_value):
@@ -734,25 +940,11 @@ class PathTemplater:
             kwargs.pop(item, None)
         if not kwargs: return new_obj
         return new_obj.add_to_dict(**kwargs)
-    @staticmethod
-    def _preset_addtodict_boundmethod(instance, **kwargs):
-        return PathTemplater._bound_method(lambda self: PathTemplater.add_to_dict(self, **kwargs), instance)
-    @staticmethod
-    def _preset_addtodict_withcalls_boundmethod(instance, **kwargs):
-        return PathTemplater._bound_method(lambda self: PathTemplater._add_to_dict_with_calls(self, **kwargs), instance)
-    @staticmethod
-    def _preset_expand_boundmethod(instance, **kwargs):
-        return PathTemplater._bound_method(lambda self: PathTemplater.expand(self, partial = True, **kwargs), instance)
-    def _get_directory_aspathlib(self):
+    def _expand_preset(self, **kwargs):
         """
-        Generate a path consisting only of the top directory and directory
-        components of the path as a pathlib.Path.
-
+        Partially expand the object with `**kwargs`, for expandable presets.
         """
-        if not self._is_initialized():
-            raise ValueError("Cannot use() PathTemplater - not fully initialized")
-        path = pathlib.Path(self._topdir_value)
-        return path / self._directory
+        return self.expand(partial = True, **kwargs)
     def get_directory(self):
         """
         Generate a path consisting only of parent component of the formatted
@@ -775,15 +967,32 @@ class PathTemplater:
 
         """
         return self.aspathlib().name.__str__()
+    def _build_template_str(self):
+        """
+        Generate the unformatted path as a string, or `None` if this object
+        has not been fully initialized. Called by methods that alter the path
+        elements, with the result stored in `_template_str` so that `use()`
+        only needs to format it.
+        """
+        if not self._is_initialized(): return None
+        return _assemble_template(self._topdir_value, self._directory,
+            self._filename_template, self._filename_affix, self._suffix)
+    def _update_template_str(self):
+        """
+        Store the unformatted path from `_build_template_str()` in
+        `_template_str`, and whether it contains any placeholders (or
+        braces) in `_has_placeholders`.
+        """
+        template = self._template_str = self._build_template_str()
+        self._has_placeholders = template is not None and ('{' in template or '}' in template)
     def _use(self, format = True):
-        path = self._get_directory_aspathlib() / self.filename_template_affix
-        suffix = self._suffix
-        if suffix:
-            path = path.with_suffix(''.join(path.suffixes) + suffix)
-            # with_suffix replaces any existing suffix, this ensures we
-            # add to any existing suffix on template
-        template = path.__str__()
-        if format: return string.Formatter().vformat(template, (), _PartialDict(self._format_dict))
+        template = self._template_str
+        if template is None:
+            raise ValueError("Cannot use() PathTemplater - not fully initialized")
+        if format:
+            if not self._has_placeholders: return template
+            if not self._format_dict: return _format_as_is(template)
+            return template.format_map(_PartialDict(self._format_dict))
         return template
     def use(self):
         """
@@ -794,8 +1003,25 @@ class PathTemplater:
         >>> foobar_templater.use()
         'foo/bar/myfile_oof_extrabar.foobar'
 
+        The result is stored, so repeated calls on the same object (including
+        via `str()`) do not format the path again.
+        """
+        formatted = self._use_cache
+        if formatted is None:
+            formatted = self._use_cache = self._use(format = True)
+        return formatted
+    @staticmethod
+    def clear_cache():
+        """
+        Clear the module-level caches of assembled and parsed templates, e.g.
+        between runs in a long-running process. These are keyed only on
+        template strings, so this frees memory without affecting results.
+
+        >>> PathTemplater.clear_cache()
         """
-        return self._use(format = True)
+        for cached_func in (_assemble_template, _parse_template,
+                            _template_fields, _format_as_is):
+            cached_func.cache_clear()
     def aspathlib(self):
         """
         Generates the path using `use()` and returns result as `pathlib.Path`.
@@ -823,31 +1049,42 @@ class PathTemplater:
         Generate a copy of the object that contains `**kwargs` added to the
         `format_dict` for wildcard resolving.
         """
-        new_obj = copy.deepcopy(self)
-        if len(kwargs)==0:
+        new_obj = self._clone()
+        if kwargs:
+            new_obj._format_dict = dict(self._format_dict, **kwargs)
+        elif __debug__: # warning removed when run with python -O
             warnings.warn("add_to_dict() called on PathTemplater with no arguments")
-        else:
-            new_obj._format_dict.update(**kwargs)
         return new_obj
     def clear_dict(self):
         """
         Generate a copy of the object with `format_dict` cleared
+
+        >>> foobar_templater = PathTemplater().create("foo/bar/myfile_{animal}.foobar")
+        >>> foobar_templater.add_to_dict(animal = 'cat').clear_dict().use()
+        'foo/bar/myfile_{animal}.foobar'
+
         """
-        return self.new_directory({})
+        new_obj = self._clone()
+        new_obj._format_dict = {}
+        return new_obj
     def new_directory(self, new_directory):
         """
         Generate a copy of the object with `format_dict` replaced by `new_directory`.
         """
-        new_obj = copy.deepcopy(self)
-        new_obj._directory = new_directory
+        new_obj = self._clone()
+        new_obj._directory = str(new_directory)
+        new_obj._init_flags |= PathTemplater._INIT_DIRECTORY
+        new_obj._update_template_str()
         return new_obj
     def new_template(self, new_template):
         """
         Generate a copy of the object with `filename_template` replaced by
         `new_template`.
         """
-        new_obj = copy.deepcopy(self)
+        new_obj = self._clone()
         new_obj._filename_template = new_template
+        new_obj._init_flags |= PathTemplater._INIT_TEMPLATE
+        new_obj._update_template_str()
         return new_obj
     def remove_affix(self):
         """
@@ -875,8 +1112,9 @@ class PathTemplater:
         >>> foobar_templater.new_affix("_extrabar").use()
         'foo/bar/myfile_extrabar.foobar'
         """
-        new_obj = copy.deepcopy(self)
+        new_obj = self._clone()
         new_obj._filename_affix = new_affix
+        new_obj._update_template_str()
         return new_obj
     def apply_affix(self):
         """
@@ -885,9 +1123,10 @@ class PathTemplater:
         `filename_affix` can no longer be removed. but a new (additional)
         `filename_affix` could be added.
         """
-        new_obj = copy.deepcopy(self)
-        new_obj._filename_template = new_obj.filename_template_affix
+        new_obj = self._clone()
+        new_obj._filename_template = self._filename_template + self._filename_affix
         new_obj._filename_affix = ""
+        new_obj._update_template_str()
         return new_obj
     def new_suffix(self, new_suffix, suffix_append = False):
         """
@@ -905,12 +1144,13 @@ class PathTemplater:
         'foo/bar/myfile.foobar.boo'
 
         """
-        new_obj = copy.deepcopy(self)
+        new_obj = self._clone()
         if new_suffix.startswith('+'):
             suffix_append = True
             new_suffix = new_suffix[1:]
         if suffix_append: new_obj._suffix += new_suffix
         else: new_obj._suffix = new_suffix
+        new_obj._update_template_str()
         return new_obj
     def no_suffix(self):
         """
@@ -922,13 +1162,24 @@ class PathTemplater:
 
         """
         return self.new_suffix("")
-    def expand_ends(self):
+    def expand_ends(self, end_labels, end_placeholder = 'end_label'):
         """
-        Generate a dict mapping each `end_label` to its path, e.g.
+        Generate a dict mapping each label in `end_labels` to its path, with
+        the `end_placeholder` placeholder formatted as that label, e.g.
         `{'R1' : 'out/{sample_name}_R1.ext', 'R2' : 'out/{sample_name}_R2.ext'}`
+
+        >>> end_templater = PathTemplater().create("out/{sample_name}_{end_label}.ext")
+        >>> end_templater.expand_ends(['R1', 'R2'])
+        {'R1': 'out/{sample_name}_R1.ext', 'R2': 'out/{sample_name}_R2.ext'}
+
         """
-        return dict(zip(end_labels,
-            map(lambda x: self._end(x).use(), end_labels)))
+        template = self._use(format = False)
+        mapping = _PartialDict(self._format_dict)
+        expanded = {}
+        for end_label in end_labels:
+            mapping[end_placeholder] = end_label
+            expanded[end_label] = template.format_map(mapping)
+        return expanded
     def apply_format(self, **kwargs):
         """
         Generate a copy of the object with any placeholders in
@@ -941,11 +1192,23 @@ class PathTemplater:
         'foo/bar/myfile-cat-{food}_george.foobar'
         """
         new_obj = self.add_to_dict(**kwargs)
+        filename_template = new_obj._filename_template
+        filename_affix = new_obj._filename_affix
+        template_has_braces = '{' in filename_template or '}' in filename_template
+        affix_has_braces = '{' in filename_affix or '}' in filename_affix
+        if not (template_has_braces or affix_has_braces):
+            return new_obj # nothing to format, path unchanged
         tracking_dict = _TrackingPartialDict(new_obj._format_dict)
-        new_obj._filename_template = string.Formatter().vformat(new_obj._filename_template, (),tracking_dict)
-        new_obj._filename_affix = string.Formatter().vformat(new_obj._filename_affix, (),tracking_dict)
-        for item in tracking_dict.used_items:
-            new_obj._format_dict.pop(item, None) # supplying default prevents KeyError for misisng items
+        if template_has_braces:
+            new_obj._filename_template = filename_template.format_map(tracking_dict)
+        if affix_has_braces:
+            new_obj._filename_affix = filename_affix.format_map(tracking_dict)
+        used_items = tracking_dict.used_items
+        if used_items:
+            # new dict without used items, existing dict may be shared
+            new_obj._format_dict = {key: value for key, value in new_obj._format_dict.items()
+                                    if key not in used_items}
+        new_obj._update_template_str()
         return new_obj
     def pformat(self, **kwargs):
         """
@@ -964,9 +1227,53 @@ class PathTemplater:
 
         All named placeholders must be supplied in `**kwargs`. As per the
         Python `str.format` method, a `KeyError` is produced if any named
-        placeholder is missing.
-        """
-        return self.use().format(**kwargs)
+        placeholder is missing, giving all missing placeholders.
+
+        >>> PathTemplater().create("foo/{alpha}-{beta}_{gamma}.foobar").format(beta = 'yyy')
+        Traceback (most recent call last):
+        ...
+        KeyError: ('alpha', 'gamma')
+        """
+        template = self.use()
+        try:
+            return template.format_map(kwargs)
+        except KeyError:
+            missing = [field_name for field_name in _template_fields(template)
+                       if field_name not in kwargs]
+            if len(missing) > 1:
+                raise KeyError(*missing) from None
+            raise
+    def iter_expand(self, combinator = itertools.product, partial = False,
+                    **kwargs):
+        """
+        Same as `expand()`, but returns an iterator that generates each path
+        when required, rather than a list, avoiding holding all paths in
+        memory for large expansions.
+
+        >>> ab_templater = PathTemplater().create("foo/{alpha}-{beta}.foobar")
+        >>> expanded = ab_templater.iter_expand(alpha = ['xxx1', 'xxx2'], beta = 'yyy')
+        >>> next(expanded)
+        'foo/xxx1-yyy.foobar'
+        >>> list(expanded)
+        ['foo/xxx2-yyy.foobar']
+
+        """
+        keys = list(kwargs)
+        value_lists = [_as_values(value) for value in kwargs.values()]
+        # template is the same for every combination, so only the
+        # placeholder values need to be substituted in the loop
+        if partial:
+            template = self._use(format = False)
+            mapping = _PartialDict(self._format_dict)
+        else:
+            template = self.use()
+            mapping = {}
+        def generate_expanded():
+            # every combination sets all keys, so a single mapping can be reused
+            for combination in combinator(*value_lists):
+                mapping.update(zip(keys, combination))
+                yield template.format_map(mapping)
+        return generate_expanded()
     def expand(self, combinator = itertools.product, partial = False, **kwargs):
         """
         Generate all combinations of the path using collections of values for
@@ -981,46 +1288,33 @@ class PathTemplater:
         `partial = True` allows partial formatting, i.e. some format
         placeholders to be missing, otherwise missing values for named
         placeholders results in a `KeyError`.
-        """
 
-        if partial:
-            format_func = lambda combination: self.add_to_dict(**combination).use()
-        else:
-            format_func = lambda combination: self.use().format(**combination)
-
-        def expand_kwargs(kwargs):
-            # generator that yields keyx: [item1, item2, item3] expanded
-            # to [(keyx, item1), (keyx: item2), (keyx: item3)]
-            for key, value in kwargs.items():
-                if isinstance(value, str) or not isinstance(value, typing.Iterable):
-                    yield [(key, value)]
-                else:
-                    yield [(key, item) for item in value]
-        expanded_kwargs = list(expand_kwargs(kwargs))
-        return [format_func(combination)
-                for combination in map(dict, combinator(*expanded_kwargs))]
+        Use `iter_expand()` to generate paths when required instead of as a
+        list.
+
+        >>> ab_templater = PathTemplater().create("foo/{alpha}-{beta}.foobar")
+        >>> ab_templater.expand(alpha = ['xxx1', 'xxx2'], beta = 'yyy')
+        ['foo/xxx1-yyy.foobar', 'foo/xxx2-yyy.foobar']
+
+        """
+        return list(self.iter_expand(combinator, partial, **kwargs))
     def __str__(self):
         return self.use()
-    def _getattrs(self, attrs):
-        if isinstance(attrs ,str):
-            return [getattr(self, attrs)]
-        return (getattr(self, attr) for attr in attrs)
     def __repr__(self):
-        repr_format_values = [
-            (' top directory: {} "{}"', ["_topdir_name", "_topdir_value"]),
-            (' directory: "{}"', ["_directory"]),
-            (' filename template: "{}"', ["_filename_template"]),
-            (' filename affix: "{}"', ["_filename_affix"]),
-            (' suffix: "{}"', ["_suffix"]),
-            (' format dictionary: {}', ["_format_dict"]),
-            (' top directory functions: {[topdirs]}', ["_extra_attrs"]),
-            (' alternate suffix functions: {[alt_suffixes]}', ["_extra_attrs"]),
-            (' preset functions: {[presets]}', ["_extra_attrs"]),
-        ]
-        #return "\n".join(repr_format.format(self._getattrs(repr_values)) for repr_format,repr_values in repr_format_values)
-        return "PathTemplater:\n"+ \
-               "\n".join(repr_format.format(*map(lambda x: getattr(self,x),repr_values)) for repr_format,repr_values in repr_format_values)+ \
-               "\n formatted: "+ (str(self) if self._is_initialized() else '(uninitialized)')
+        topdir_funcs = [PathTemplater._get_settopdir_methodname(name) for name in self._topdirs]
+        altsuffix_funcs = [PathTemplater._get_setfilesuffix_methodname(name) for name in self._altsuffixes]
+        formatted = self.use() if self._is_initialized() else '(uninitialized)'
+        return (f'PathTemplater:\n'
+                f' top directory: {self._topdir_name} "{self._topdir_value}"\n'
+                f' directory: "{self._directory}"\n'
+                f' filename template: "{self._filename_template}"\n'
+                f' filename affix: "{self._filename_affix}"\n'
+                f' suffix: "{self._suffix}"\n'
+                f' format dictionary: {self._format_dict}\n'
+                f' top directory functions: {topdir_funcs}\n'
+                f' alternate suffix functions: {altsuffix_funcs}\n'
+                f' preset functions: {list(self._presets)}\n'
+                f' formatted: {formatted}')
 
 
 
@@ -1045,8 +1339,8 @@ alternative suffix provided. Each of these methods provides a way of producing
 a derived object to produce a path for a different file type. If the
 `altsuffix_value` begins with a `+` character, the new suffix is appended to
 any existing suffix(es) on the filename. Otherwise, the suffix replaces the
-current `suffix` in the object when the path is formatted. As suffix operations
-use the `pathlib` package, they must begin with a dot. If an `altsuffix_name`
+current `suffix` in the object when the path is formatted. Suffixes are added
+directly to the filename, so should begin with a dot. If an `altsuffix_name`
 is identical to a provided `topdir_name`, calling the associated `file()`
 method will also set the top directory at the same time. This behaviour is
 useful, for example, to produce paths for log files with a certain extension